@@ -11,22 +11,130 @@ import csv
 import subprocess
 import tempfile
 import logging
+import logging.handlers
+import queue
+import gzip
+import shutil
+import atexit
+import hmac
+import marshal
+import pstats
+import tracemalloc
 import threading
 import time
 import asyncio
 import random
+import bisect
+import itertools
+import functools
+import codecs
+import io
+from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Request, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 import pandas as pd
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
+# Avisos de configuração inválida, emitidos assim que o logging estiver pronto
+config_warnings = []
+
+def env_int(name, default):
+    """Inteiro não negativo da variável de ambiente; valor inválido usa o padrão com aviso"""
+    raw = os.environ.get(name, '').strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+        if value < 0:
+            raise ValueError(raw)
+        return value
+    except ValueError:
+        config_warnings.append(f"⚠️ {name} inválido '{raw}', usando {default}")
+        return default
+
+# Configuração de logging: emissores só enfileiram, uma thread escreve console e arquivos
+LOG_DIR = Path(os.environ.get('LOG_DIR', Path(__file__).with_name('logs')))
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()  # text ou json
+LOG_MAX_BYTES = env_int('LOG_MAX_MB', 10) * 1024 * 1024
+LOG_BACKUP_COUNT = env_int('LOG_BACKUP_COUNT', 5)
+
+# Limites de upload (configuráveis por variável de ambiente)
+MAX_UPLOAD_MB = env_int('MAX_UPLOAD_MB', 100)
+UPLOAD_SPOOL_KB = env_int('UPLOAD_SPOOL_KB', 1024)
+
+class JsonLogFormatter(logging.Formatter):
+    """Formata registros como uma linha JSON (para ingestão em ferramentas de log)"""
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),  # QueueHandler já anexa o traceback à mensagem
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+def gzip_rotator(source, dest):
+    """Comprime o arquivo rotacionado e remove o original"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def setup_logging():
+    """Configura QueueHandler no root e QueueListener com console + arquivo rotativo"""
+    if LOG_FORMAT == 'json':
+        formatter = JsonLogFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s [%(threadName)s] %(message)s')
+    
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+    
+    try:
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_DIR / 'backend.log', maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+        file_handler.namer = lambda name: name + '.gz'
+        file_handler.rotator = gzip_rotator
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    except OSError as e:
+        sys.stderr.write(f"⚠️ Log em arquivo desativado ({LOG_DIR}): {e}\n")
+    
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    # Nível inválido em LOG_LEVEL não impede o backend de subir
+    level_valid = isinstance(logging.getLevelName(LOG_LEVEL), int)
+    root.setLevel(LOG_LEVEL if level_valid else logging.INFO)
+    if not level_valid:
+        config_warnings.append(f"⚠️ LOG_LEVEL inválido '{LOG_LEVEL}', usando INFO")
+    
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    for message in config_warnings:
+        logging.getLogger(__name__).warning(message)
+    return listener
+
+log_listener = setup_logging()
 logger = logging.getLogger(__name__)
 
+class SpooledRequest(Request):
+    """Request que mantém uploads em memória só até o limite de spool, depois em disco"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_KB * 1024, mode='rb+')
+
 from flask_cors import CORS
 app = Flask(__name__, static_folder="../", static_url_path="/")
+app.request_class = SpooledRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
+app.config['MAX_FORM_MEMORY_SIZE'] = 1024 * 1024  # Campos de formulário que não são arquivo
 CORS(app,)
 
 
@@ -54,9 +162,13 @@ app_state = {
         'groupsInCurrentSession': 0,
     },
     'contacts': [],
+    'contact_index': None,
     'last_config': None
 }
 
+# Protege lista de contatos e índices entre requisições concorrentes
+contacts_lock = threading.Lock()
+
 def convert_js_to_python(obj):
     """Converte recursivamente valores JavaScript para Python"""
     if isinstance(obj, dict):
@@ -75,24 +187,147 @@ def convert_js_to_python(obj):
     else:
         return obj
 
+# Plano de numeração: trie de prefixos (DDI + DDD) compilada a partir de dados locais
+NUMBERING_PLAN_FILE = Path(__file__).with_name('numbering_plan.json')
+
+def compile_numbering_plan(plan):
+    """Compila o plano de numeração em uma trie de dígitos (dicts aninhados)"""
+    trie = {}
+    for region, rules in plan['regions'].items():
+        node = trie
+        for digit in rules['country_code']:
+            node = node.setdefault(digit, {})
+        node['$country'] = region
+        # DDIs não são prefixo uns dos outros: filhos do nó do país são DDDs
+        for area in rules.get('area_codes', []):
+            area_node = node
+            for digit in area:
+                area_node = area_node.setdefault(digit, {})
+            area_node['$area'] = area
+    return trie
+
+with open(NUMBERING_PLAN_FILE, encoding='utf-8') as plan_file:
+    NUMBERING_PLAN = json.load(plan_file)
+PHONE_REGIONS = NUMBERING_PLAN['regions']
+DEFAULT_PHONE_REGION = NUMBERING_PLAN['default_region']
+PHONE_PREFIX_TRIE = compile_numbering_plan(NUMBERING_PLAN)
+
+def match_international(digits):
+    """Valida dígitos com DDI pelo plano de numeração; retorna E.164 (só dígitos) ou None"""
+    node = PHONE_PREFIX_TRIE
+    region = None
+    cc_len = area_len = 0
+    for i, digit in enumerate(digits):
+        node = node.get(digit)
+        if node is None:
+            break
+        if '$country' in node:
+            region, cc_len = node['$country'], i + 1
+        elif '$area' in node:
+            area_len = i + 1 - cc_len
+    if region is None:
+        return None
+
+    rules = PHONE_REGIONS[region]
+    if 'area_codes' in rules:
+        # Região com DDD: exige DDD válido e regra de assinante (ex.: 9º dígito no celular)
+        if not area_len:
+            return None
+        subscriber = digits[cc_len + area_len:]
+        if not any(len(subscriber) == rule['length'] and subscriber[:1] in rule['leading']
+                   for rule in rules['subscriber_rules']):
+            return None
+    else:
+        min_len, max_len = rules['nsn_length']
+        if not min_len <= len(digits) - cc_len <= max_len:
+            return None
+    return digits
+
+@functools.lru_cache(maxsize=None)
+def max_national_length(region):
+    """Maior número nacional da região (DDD + assinante ou NSN)"""
+    rules = PHONE_REGIONS[region]
+    if 'area_codes' in rules:
+        return (max(len(area) for area in rules['area_codes'])
+                + max(rule['length'] for rule in rules['subscriber_rules']))
+    return rules['nsn_length'][1]
+
+def normalize_phone_number(numero, region=DEFAULT_PHONE_REGION):
+    """Normaliza número para E.164 (sem '+'), tentando primeiro o formato nacional da região"""
+    if isinstance(numero, float) and numero.is_integer():
+        numero = int(numero)  # Ex.: valor numérico lido de JSON/planilha
+    text = str(numero).strip()
+    digits = ''.join(filter(str.isdigit, text))
+    
+    # '+' ou '00' indicam número já com DDI
+    if text.startswith('+'):
+        return match_international(digits)
+    if digits.startswith('00'):
+        return match_international(digits[2:])
+    
+    # Número nacional: remove prefixo de tronco e aplica o DDI da região
+    rules = PHONE_REGIONS[region]
+    national = digits
+    trunk = rules.get('trunk_prefix')
+    if trunk and national.startswith(trunk):
+        national = national[len(trunk):]
+    normalized = match_international(rules['country_code'] + national)
+    if normalized:
+        return normalized
+    
+    # Dígitos já com DDI (ex.: 5562999999999); só aceitos se mais longos que um
+    # número nacional, para não reinterpretar um número local malformado como estrangeiro
+    if len(digits) > max_national_length(region):
+        return match_international(digits)
+    return None
+
 def validate_phone_number(numero):
-    """Valida e formata número de telefone"""
+    """Valida e formata número de telefone (E.164 sem '+')"""
     try:
-        # Remove todos os caracteres não numéricos
-        numero_limpo = ''.join(filter(str.isdigit, str(numero)))
-        
-        # Verifica se tem pelo menos 10 dígitos
-        if len(numero_limpo) < 10:
-            return None
-        
-        # Adiciona DDI brasileiro se não tiver
-        if not numero_limpo.startswith('55'):
-            numero_limpo = f"55{numero_limpo}"
-        
-        return numero_limpo
-    except:
+        return normalize_phone_number(numero)
+    except Exception:
         return None
 
+CONTACT_TIPOS = ('lead', 'administrador')
+
+def make_contact(nome, numero, tipo):
+    """Cria contato validado (None se número inválido)
+    
+    Nome vazio é mantido vazio: o nome provisório só é aplicado ao gravar
+    (ver fill_contact_name), para que um merge não sobrescreva o nome existente.
+    """
+    numero_validado = validate_phone_number(numero)
+    if not numero_validado:
+        return None
+    
+    return {
+        'nome': normalize_nome(nome),
+        'numero': numero_validado,
+        'tipo': normalize_tipo(tipo)
+    }
+
+def normalize_nome(nome):
+    """Nome sem espaços nas pontas (vazio se ausente)"""
+    return str(nome or '').strip()
+
+def normalize_tipo(tipo):
+    """Tipo em minúsculas; 'lead' se ausente ou inválido"""
+    tipo = str(tipo or '').strip().lower()
+    return tipo if tipo in CONTACT_TIPOS else 'lead'
+
+def fill_contact_name(contact, seq):
+    """Aplica o nome provisório "Contato N" a contatos sem nome"""
+    if not contact['nome']:
+        contact['nome'] = f"Contato {seq}"
+    return contact
+
+# Palavras-chave de cabeçalho por campo do contato
+HEADER_KEYWORDS = {
+    'nome': ('nome', 'name'),
+    'numero': ('numero', 'number'),
+    'tipo': ('tipo', 'type'),
+}
+
 def detect_separator(text):
     """Detecta o separador usado no arquivo"""
     separators = [',', ';', '\t', '|']
@@ -112,119 +347,744 @@ def detect_separator(text):
             max_columns = columns
             best_separator = sep
     
-    print(f"🔍 Separador detectado: '{best_separator}' ({max_columns} colunas)")
+    logger.info(f"🔍 Separador detectado: '{best_separator}' ({max_columns} colunas)")
     return best_separator
 
 def process_flexible_data(file_content):
-    """Processa dados de forma flexível - aceita qualquer formato"""
+    """Processa dados de forma flexível - aceita qualquer formato
+    
+    Aceita bytes, texto ou um arquivo binário (ex.: upload em spool),
+    lido linha a linha sem carregar o conteúdo inteiro em memória.
+    """
     try:
-        contacts = []
+        if isinstance(file_content, str):
+            return parse_flexible_lines(io.StringIO(file_content))
+        if isinstance(file_content, bytes):
+            file_content = io.BytesIO(file_content)
         
         # Tenta diferentes encodings
         encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        text_content = None
         
         for encoding in encodings:
+            file_content.seek(0)
             try:
-                if isinstance(file_content, bytes):
-                    text_content = file_content.decode(encoding)
-                else:
-                    text_content = file_content
-                break
+                # Todos os encodings aceitos são compatíveis com ASCII: b'\n' delimita linhas
+                return parse_flexible_lines(line.decode(encoding) for line in file_content)
             except UnicodeDecodeError:
                 continue
         
-        if not text_content:
-            raise Exception("Não foi possível decodificar o arquivo")
-        
-        print(f"📄 Conteúdo do arquivo (primeiras 3 linhas):")
-        lines = text_content.strip().split('\n')
-        for i, line in enumerate(lines[:3]):
-            print(f"   Linha {i+1}: {line}")
-        
-        # Detecta separador
-        separator = detect_separator(text_content)
-        
-        # Processa linha por linha
-        if len(lines) < 1:
-            raise Exception("Arquivo vazio")
-        
-        # Verifica se a primeira linha é cabeçalho
-        first_line = lines[0].lower()
-        has_header = any(word in first_line for word in ['nome', 'numero', 'tipo', 'name', 'number', 'type'])
-        
-        print(f"📋 Cabeçalho detectado: {'Sim' if has_header else 'Não'}")
-        
-        # Define as linhas de dados
-        data_lines = lines[1:] if has_header else lines
-        
-        print(f"📊 Processando {len(data_lines)} linhas de dados...")
-        
-        # Processa cada linha
-        for row_num, line in enumerate(data_lines, 1):
-            try:
-                if not line.strip():
-                    continue
-                
-                # Divide a linha pelo separador
-                parts = line.split(separator)
-                
-                if len(parts) < 2:
-                    print(f"⚠️  Linha {row_num}: Poucos campos ({len(parts)}) - pulando")
-                    continue
-                
-                # Extrai dados baseado no número de colunas
-                if len(parts) == 2:
-                    # Formato: nome,numero
-                    nome = parts[0].strip()
-                    numero = parts[1].strip()
-                    tipo = 'lead'  # Padrão
-                elif len(parts) >= 3:
-                    # Formato: nome,numero,tipo
-                    nome = parts[0].strip()
-                    numero = parts[1].strip()
-                    tipo = parts[2].strip().lower()
-                else:
-                    continue
-                
-                # Valida número
-                numero_validado = validate_phone_number(numero)
-                if not numero_validado:
-                    print(f"⚠️  Linha {row_num}: Número inválido '{numero}' - pulando")
-                    continue
-                
-                # Valida tipo
-                if tipo not in ['lead', 'administrador']:
-                    tipo = 'lead'  # Padrão se tipo inválido
-                
-                # Cria contato
-                contact = {
-                    'nome': nome if nome else f"Contato {len(contacts) + 1}",
-                    'numero': numero_validado,
-                    'tipo': tipo
-                }
-                contacts.append(contact)
-                
-                print(f"✅ Linha {row_num}: {contact['nome']} ({contact['numero']}) - {contact['tipo']}")
-                
-            except Exception as e:
-                print(f"❌ Erro na linha {row_num}: {e}")
-                continue
-        
-        if not contacts:
-            raise Exception("Nenhum contato válido encontrado no arquivo")
-        
-        print(f"📊 PROCESSAMENTO CONCLUÍDO:")
-        print(f"   ✅ {len(contacts)} contatos válidos")
-        print(f"   👥 {len([c for c in contacts if c['tipo'] == 'lead'])} leads")
-        print(f"   👑 {len([c for c in contacts if c['tipo'] == 'administrador'])} administradores")
-        
-        return contacts
+        raise Exception("Não foi possível decodificar o arquivo")
         
     except Exception as e:
-        print(f"❌ Erro ao processar arquivo: {e}")
+        logger.error(f"❌ Erro ao processar arquivo: {e}")
         raise
 
+def parse_flexible_lines(lines):
+    """Converte linhas de texto (qualquer iterável) em contatos"""
+    contacts = []
+    lines = iter(lines)
+    
+    # Primeira linha não vazia define separador e cabeçalho
+    first_line = next((line for line in lines if line.strip()), None)
+    if first_line is None:
+        raise Exception("Arquivo vazio")
+    first_line = first_line.strip()
+    
+    logger.info(f"📄 Primeira linha do arquivo: {first_line}")
+    
+    # Detecta separador
+    separator = detect_separator(first_line)
+    
+    # Verifica se a primeira linha é cabeçalho
+    has_header = any(word in first_line.lower() for words in HEADER_KEYWORDS.values() for word in words)
+    
+    logger.info(f"📋 Cabeçalho detectado: {'Sim' if has_header else 'Não'}")
+    
+    # Define as linhas de dados
+    data_lines = lines if has_header else itertools.chain([first_line], lines)
+    
+    # Processa cada linha
+    row_num = 0
+    for row_num, line in enumerate(data_lines, 1):
+        try:
+            if not line.strip():
+                continue
+            
+            # Divide a linha pelo separador
+            parts = line.split(separator)
+            
+            if len(parts) < 2:
+                logger.warning("⚠️  Linha %d: Poucos campos (%d) - pulando", row_num, len(parts))
+                continue
+            
+            # Extrai dados baseado no número de colunas
+            if len(parts) == 2:
+                # Formato: nome,numero
+                nome = parts[0].strip()
+                numero = parts[1].strip()
+                tipo = 'lead'  # Padrão
+            else:
+                # Formato: nome,numero,tipo
+                nome = parts[0].strip()
+                numero = parts[1].strip()
+                tipo = parts[2].strip().lower()
+            
+            # Valida número e tipo, cria contato
+            contact = make_contact(nome, numero, tipo)
+            if not contact:
+                logger.warning("⚠️  Linha %d: Número inválido '%s' - pulando", row_num, numero)
+                continue
+            contacts.append(contact)
+            
+            logger.debug("✅ Linha %d: %s (%s) - %s", row_num, contact['nome'], contact['numero'], contact['tipo'])
+            
+        except Exception as e:
+            logger.error("❌ Erro na linha %d: %s", row_num, e)
+            continue
+    
+    if not contacts:
+        raise Exception("Nenhum contato válido encontrado no arquivo")
+    
+    logger.info(f"📊 PROCESSAMENTO CONCLUÍDO:")
+    logger.info(f"   📄 {row_num} linhas de dados lidas")
+    logger.info(f"   ✅ {len(contacts)} contatos válidos")
+    logger.info(f"   👥 {len([c for c in contacts if c['tipo'] == 'lead'])} leads")
+    logger.info(f"   👑 {len([c for c in contacts if c['tipo'] == 'administrador'])} administradores")
+    
+    return contacts
+
+def extract_ddd(numero):
+    """Extrai o DDD (dois dígitos após o 55) de um número normalizado"""
+    if numero.startswith('55') and len(numero) >= 4:
+        return numero[2:4]
+    return None
+
+# Ingestão de planilhas colunares (XLSX / Parquet) via pandas
+COLUMNAR_EXTENSIONS = ('.xlsx', '.parquet')
+
+def map_header_columns(columns):
+    """Mapeia colunas do arquivo para nome/numero/tipo pelas palavras-chave de cabeçalho"""
+    mapping = {}
+    for column in columns:
+        label = str(column).strip().lower()
+        for field, words in HEADER_KEYWORDS.items():
+            if field not in mapping and any(word in label for word in words):
+                mapping[field] = column
+                break
+    return mapping
+
+def normalize_phone_series(series):
+    """Normaliza uma coluna de números em lote (mesmas regras de validate_phone_number)"""
+    texts = (series.astype('string')
+                   .str.strip()
+                   .str.replace(r'\.0+$', '', regex=True))  # Números lidos como float
+    # Cada valor distinto passa uma vez pela trie
+    uniques = texts.dropna().unique()
+    normalized = dict(zip(uniques, map(validate_phone_number, uniques)))
+    return texts.map(normalized).astype('string')
+
+def normalize_text_series(series, normalize):
+    """Aplica normalize_nome/normalize_tipo a uma coluna, uma vez por valor distinto"""
+    texts = series.astype('string').fillna('')
+    uniques = texts.unique()
+    return texts.map(dict(zip(uniques, map(normalize, uniques))))
+
+def read_columnar_frame(file_obj, extension):
+    """Lê só as colunas de contato do XLSX/Parquet"""
+    is_keyword_column = lambda column: bool(map_header_columns([column]))
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        schema = pq.ParquetFile(file_obj).schema_arrow
+        file_obj.seek(0)
+        # Índices gravados pelo pandas (ex.: após set_index) não são colunas de dados;
+        # RangeIndex aparece nos metadados como dict e não ocupa coluna
+        index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+        names = [name for name in schema.names if name not in index_columns]
+        mapping = map_header_columns(names)
+        if 'numero' not in mapping:
+            mapping = dict(zip(('nome', 'numero', 'tipo'), names[:3]))
+        frame = pd.read_parquet(file_obj, columns=list(mapping.values()))
+        return frame.reset_index(drop=True), mapping
+
+    frame = pd.read_excel(file_obj, usecols=is_keyword_column, dtype=object)
+    mapping = map_header_columns(frame.columns)
+    if 'numero' not in mapping:
+        # Sem cabeçalho reconhecido: mesmo layout posicional do CSV (nome, numero, tipo)
+        file_obj.seek(0)
+        frame = pd.read_excel(file_obj, header=None, usecols=lambda i: i < 3, dtype=object)
+        mapping = dict(zip(('nome', 'numero', 'tipo'), frame.columns))
+    return frame, mapping
+
+def process_columnar_file(file_obj, extension):
+    """Processa XLSX/Parquet com normalização vetorizada dos números"""
+    frame, mapping = read_columnar_frame(file_obj, extension)
+    logger.info(f"📋 Colunas mapeadas: {mapping} ({len(frame)} linhas)")
+    if 'numero' not in mapping:
+        raise Exception("Coluna de número não encontrada")
+
+    numeros = normalize_phone_series(frame[mapping['numero']])
+    valid = numeros.notna()
+    numeros = numeros[valid]
+
+    # Mesmas regras de make_contact para nome e tipo
+    if 'nome' in mapping:
+        nomes = normalize_text_series(frame.loc[valid, mapping['nome']], normalize_nome)
+    else:
+        nomes = pd.Series('', index=numeros.index)
+    if 'tipo' in mapping:
+        tipos = normalize_text_series(frame.loc[valid, mapping['tipo']], normalize_tipo)
+    else:
+        tipos = pd.Series(normalize_tipo(None), index=numeros.index)
+
+    contacts = [
+        {'nome': nome, 'numero': numero, 'tipo': tipo}
+        for nome, numero, tipo in zip(nomes, numeros, tipos)
+    ]
+
+    logger.info(f"📊 PROCESSAMENTO CONCLUÍDO: {len(contacts)} contatos válidos, {int((~valid).sum())} números inválidos")
+    if not contacts:
+        raise Exception("Nenhum contato válido encontrado no arquivo")
+    return contacts
+
+# Índices de contatos para consulta paginada
+_index_generations = itertools.count()
+
+# Maior code point possível: cobre também caracteres fora do BMP (ex.: emoji)
+PREFIX_UPPER = chr(0x10FFFF)
+
+class SortedPostings:
+    """Pares (chave, posição) ordenados, com buffer lateral para alterações em lote
+
+    Inserções vão para um buffer ordenado e remoções só marcam o par como
+    obsoleto; ambos são aplicados em flush() com custo proporcional ao lote.
+    O array principal só é reconstruído quando buffer e obsoletos passam de
+    1/8 do total.
+    """
+
+    COMPACT_MIN = 4096
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = [k for k, _ in pairs]
+        self.positions = [p for _, p in pairs]
+        self.pending = []        # pares fora do array principal, ordenados
+        self.stale = set()       # pares ainda nos arrays que não valem mais
+        self.stale_sorted = []
+        self._added = []
+        self._removed = []
+        self._resurrected = False
+
+    def __len__(self):
+        return len(self.keys) + len(self.pending) - len(self.stale)
+
+    def add(self, key, pos):
+        pair = (key, pos)
+        if pair in self.stale:
+            # Volta a um valor anterior: reaproveita a entrada existente
+            self.stale.discard(pair)
+            self._resurrected = True
+        elif not self.keys or pair > (self.keys[-1], self.positions[-1]):
+            self.keys.append(key)
+            self.positions.append(pos)
+        else:
+            self._added.append(pair)
+
+    def remove(self, key, pos):
+        pair = (key, pos)
+        self.stale.add(pair)
+        self._removed.append(pair)
+
+    def flush(self):
+        """Aplica o lote: mescla o buffer (timsort sobre dois trechos ordenados)"""
+        if self._added:
+            self.pending = sorted(self.pending + self._added)
+        if self._resurrected:
+            self.stale_sorted = sorted(self.stale)
+        elif self._removed:
+            self.stale_sorted = sorted(self.stale_sorted + self._removed)
+        self._added, self._removed, self._resurrected = [], [], False
+        if len(self.pending) + len(self.stale) > max(self.COMPACT_MIN, len(self.keys) // 8):
+            self.compact()
+
+    def compact(self):
+        """Reconstrói o array principal incorporando o buffer e descartando obsoletos"""
+        pairs = sorted(list(zip(self.keys, self.positions)) + self.pending)
+        if self.stale:
+            pairs = [pair for pair in pairs if pair not in self.stale]
+        self.keys = [k for k, _ in pairs]
+        self.positions = [p for _, p in pairs]
+        self.pending, self.stale, self.stale_sorted = [], set(), []
+
+    def span(self, prefix=None):
+        """Intervalos [lo, hi) do prefixo no array principal e no buffer"""
+        if prefix is None:
+            return 0, len(self.keys), 0, len(self.pending)
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + PREFIX_UPPER, lo)
+        plo = bisect.bisect_left(self.pending, (prefix,))
+        phi = bisect.bisect_left(self.pending, (prefix + PREFIX_UPPER,), plo)
+        return lo, hi, plo, phi
+
+    def count(self, prefix=None):
+        """Quantidade exata de pares válidos com o prefixo"""
+        lo, hi, plo, phi = self.span(prefix)
+        if prefix is None:
+            stale = len(self.stale)
+        else:
+            stale = (bisect.bisect_left(self.stale_sorted, (prefix + PREFIX_UPPER,))
+                     - bisect.bisect_left(self.stale_sorted, (prefix,)))
+        return (hi - lo) + (phi - plo) - stale
+
+    def _split(self, span, offset):
+        """Índices no array principal e no buffer após os offset primeiros pares da intercalação"""
+        lo, hi, plo, phi = span
+        if plo == phi:
+            return min(lo + offset, hi), plo
+        offset = min(offset, (hi - lo) + (phi - plo))
+        a, b = max(0, offset - (phi - plo)), min(offset, hi - lo)
+        while a < b:
+            i = (a + b) // 2
+            if (self.keys[lo + i], self.positions[lo + i]) < self.pending[plo + offset - i - 1]:
+                a = i + 1
+            else:
+                b = i
+        return lo + a, plo + offset - a
+
+    def iter_span(self, span, offset=0):
+        """Percorre o intervalo em ordem a partir do offset, pulando pares obsoletos
+
+        Gera (pares consumidos desde o início do intervalo, posição).
+        """
+        lo, hi, plo, phi = span
+        i, j = self._split(span, offset)
+        keys, positions, pending, stale = self.keys, self.positions, self.pending, self.stale
+        if j == phi and not stale:
+            for i in range(i, hi):
+                yield i + 1 - lo + (j - plo), positions[i]
+            return
+        while i < hi or j < phi:
+            if j >= phi or (i < hi and (keys[i], positions[i]) < pending[j]):
+                pair = (keys[i], positions[i])
+                i += 1
+            else:
+                pair = pending[j]
+                j += 1
+            if pair not in stale:
+                yield (i - lo) + (j - plo), pair[1]
+
+class ContactIndex:
+    """Índices em memória sobre a lista de contatos, construídos no carregamento"""
+
+    def __init__(self, contacts):
+        self.contacts = contacts
+        self.generation = next(_index_generations)
+        self.by_numero = {}
+
+        # Pares (chave, posição) ordenados para busca por prefixo
+        self.numeros = SortedPostings((c['numero'], i) for i, c in enumerate(contacts))
+        self.nomes = SortedPostings((c['nome'].lower(), i) for i, c in enumerate(contacts))
+
+        # Listas de postagem por tipo e DDD (posições em ordem crescente)
+        tipos, ddds = {}, {}
+        for i, contact in enumerate(contacts):
+            self.by_numero.setdefault(contact['numero'], i)
+            tipos.setdefault(contact['tipo'], []).append((i, i))
+            ddd = extract_ddd(contact['numero'])
+            if ddd:
+                ddds.setdefault(ddd, []).append((i, i))
+        self.by_tipo = {tipo: SortedPostings(pairs) for tipo, pairs in tipos.items()}
+        self.by_ddd = {ddd: SortedPostings(pairs) for ddd, pairs in ddds.items()}
+
+    def query(self, tipo=None, ddd=None, numero=None, nome=None, offset=0, limit=50):
+        """Consulta paginada: percorre o índice mais seletivo e filtra o restante"""
+        nome = nome.lower() if nome else None
+
+        active_filters = sum(1 for f in (tipo, ddd, numero, nome) if f)
+
+        # Candidatas a conduzir a busca: (sequência, prefixo, intervalo)
+        candidates = []
+        for postings, key in ((self.by_tipo, tipo), (self.by_ddd, ddd)):
+            if key:
+                if key not in postings:
+                    # Filtro sem lista de postagem: nenhum contato pode casar
+                    return {'items': [], 'next_offset': None, 'total': 0}
+                candidates.append((postings[key], None))
+        if numero:
+            candidates.append((self.numeros, numero))
+        if nome:
+            candidates.append((self.nomes, nome))
+
+        # Conduz pela sequência com menos entradas; as demais viram filtro por linha
+        if candidates:
+            spans = [(seq, prefix, seq.span(prefix)) for seq, prefix in candidates]
+            seq, prefix, span = min(spans, key=lambda c: (c[2][1] - c[2][0]) + (c[2][3] - c[2][2]))
+            size = (span[1] - span[0]) + (span[3] - span[2])
+            scan = seq.iter_span(span, offset)
+            total = seq.count(prefix)
+        else:
+            size = total = len(self.contacts)
+            scan = ((pos + 1, pos) for pos in range(offset, size))
+
+        items = []
+        next_offset = None
+        for consumed, pos in scan:
+            contact = self.contacts[pos]
+            if tipo and contact['tipo'] != tipo:
+                continue
+            if ddd and extract_ddd(contact['numero']) != ddd:
+                continue
+            if numero and not contact['numero'].startswith(numero):
+                continue
+            if nome and not contact['nome'].lower().startswith(nome):
+                continue
+            items.append({**contact, 'id': pos})
+            if len(items) >= limit:
+                if consumed < size:
+                    next_offset = consumed
+                break
+
+        return {
+            'items': items,
+            'next_offset': next_offset,
+            # Total exato só quando o índice sozinho resolve a consulta
+            'total': total if active_filters <= 1 else None,
+        }
+
+    def add(self, contact):
+        """Adiciona um contato; os índices ordenados recebem o par no buffer do lote"""
+        pos = len(self.contacts)
+        self.contacts.append(contact)
+        self.by_numero.setdefault(contact['numero'], pos)
+        self.numeros.add(contact['numero'], pos)
+        self.nomes.add(contact['nome'].lower(), pos)
+        self.by_tipo.setdefault(contact['tipo'], SortedPostings()).add(pos, pos)
+        ddd = extract_ddd(contact['numero'])
+        if ddd:
+            self.by_ddd.setdefault(ddd, SortedPostings()).add(pos, pos)
+
+    def update(self, pos, contact):
+        """Substitui o contato da posição, ajustando só os índices afetados"""
+        old = self.contacts[pos]
+        self.contacts[pos] = contact
+        if old['nome'] != contact['nome']:
+            self.nomes.remove(old['nome'].lower(), pos)
+            self.nomes.add(contact['nome'].lower(), pos)
+        if old['tipo'] != contact['tipo']:
+            self.by_tipo[old['tipo']].remove(pos, pos)
+            self.by_tipo.setdefault(contact['tipo'], SortedPostings()).add(pos, pos)
+
+    def flush(self):
+        """Aplica aos índices ordenados as alterações acumuladas no lote"""
+        for postings in itertools.chain((self.numeros, self.nomes), self.by_tipo.values(), self.by_ddd.values()):
+            postings.flush()
+
+    def merge(self, contacts, update_existing=True):
+        """Aplica um lote ao conjunto atual usando o índice por número (hash)"""
+        diff = {'added': 0, 'updated': 0, 'unchanged': 0}
+        changed = []
+        for contact in contacts:
+            pos = self.by_numero.get(contact['numero'])
+            if pos is None:
+                self.add(fill_contact_name(contact, len(self.contacts) + 1))
+                diff['added'] += 1
+                changed.append(contact)
+                continue
+            current = self.contacts[pos]
+            if not contact['nome']:
+                # Linha sem nome não apaga o nome já carregado
+                contact = {**contact, 'nome': current['nome']}
+            if update_existing and (current['nome'], current['tipo']) != (contact['nome'], contact['tipo']):
+                self.update(pos, contact)
+                diff['updated'] += 1
+                changed.append(contact)
+            else:
+                diff['unchanged'] += 1
+        if diff['added'] or diff['updated']:
+            self.flush()
+            self.generation = next(_index_generations)
+        return diff, changed
+
+    def stats(self):
+        """Estatísticas do conjunto a partir das listas de postagem"""
+        total_leads = len(self.by_tipo.get('lead', ()))
+        return {
+            'totalContacts': len(self.contacts),
+            'totalLeads': total_leads,
+            'totalAdmins': len(self.by_tipo.get('administrador', ())),
+            'estimatedGroups': min(5, max(1, (total_leads + 49) // 50)),  # Máximo 5 grupos, 50 contatos por grupo
+        }
+
+UPLOAD_MODES = ('replace', 'append', 'merge')
+
+def store_contacts(contacts, mode='replace'):
+    """Grava contatos no estado global (substitui, acrescenta ou mescla)"""
+    if mode == 'replace':
+        for seq, contact in enumerate(contacts, 1):
+            fill_contact_name(contact, seq)
+        index = ContactIndex(contacts)
+        with contacts_lock:
+            app_state['contacts'] = contacts
+            app_state['contact_index'] = index
+            return index.stats(), {'added': len(contacts), 'updated': 0, 'unchanged': 0}, contacts
+
+    with contacts_lock:
+        index = app_state['contact_index']
+        if index is None:
+            index = ContactIndex([])
+            app_state['contacts'] = index.contacts
+            app_state['contact_index'] = index
+        diff, changed = index.merge(contacts, update_existing=(mode == 'merge'))
+        return index.stats(), diff, changed
+
+# Importação JSON / NDJSON em streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def iter_ndjson_records(stream):
+    """Lê NDJSON em blocos e gera (linha, registro ou erro) sem carregar o payload"""
+    buffer = b''
+    line_no = 0
+    while True:
+        chunk = stream.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, _decode_json_line(line)
+    if buffer.strip():
+        yield line_no + 1, _decode_json_line(buffer)
+
+def _decode_json_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+def iter_json_array_records(stream):
+    """Lê um array JSON em blocos e gera (índice, registro) conforme os objetos completam"""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    # Próximo token esperado: '[' | item ou ']' | ',' ou ']' | item (após vírgula)
+    expect = 'open'
+    eof = False
+    item_no = 0
+
+    # Lê até o fim do corpo: após o ']' só é aceito espaço em branco
+    while not eof:
+        chunk = stream.read(STREAM_CHUNK_SIZE)
+        eof = not chunk
+        buffer += text_decoder.decode(chunk, final=eof)
+        pos = 0
+
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if expect == 'done':
+                raise ValueError("JSON inválido: conteúdo após o fim do array")
+            if expect == 'open':
+                if char != '[':
+                    raise ValueError("JSON deve ser um array de contatos")
+                expect = 'first'
+                pos += 1
+            elif char == ']' and expect in ('first', 'separator'):
+                expect = 'done'
+                pos += 1
+            elif expect == 'separator':
+                if char != ',':
+                    raise ValueError(f"JSON inválido: esperado ',' ou ']' após o item {item_no}")
+                expect = 'item'
+                pos += 1
+            elif char in ',]':
+                raise ValueError(f"JSON inválido: '{char}' inesperado antes do item {item_no + 1}")
+            else:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if eof:
+                        raise ValueError(f"JSON inválido próximo ao item {item_no + 1}")
+                    break  # Objeto incompleto: lê mais dados
+                if end == len(buffer) and not eof:
+                    break  # Valor pode continuar no próximo bloco (ex.: número)
+                pos = end
+                item_no += 1
+                expect = 'separator'
+                yield item_no, record
+
+        buffer = buffer[pos:]
+        if eof and expect != 'done':
+            raise ValueError("Array JSON não foi fechado")
+
+def record_to_contact(record):
+    """Converte registro JSON (nome/numero/tipo ou name/number/type) em contato"""
+    if not isinstance(record, dict):
+        return None
+    nome = record.get('nome', record.get('name'))
+    numero = record.get('numero', record.get('number'))
+    tipo = record.get('tipo', record.get('type'))
+    if numero is None:
+        return None
+    return make_contact(nome, numero, tipo)
+
+def import_contact_records(records, mode):
+    """Valida registros em streaming e grava no contact store
+
+    A gravação é atômica em todos os modos: os contatos só são aplicados
+    depois que o payload inteiro foi lido, então um erro de sintaxe no meio
+    do corpo não deixa o conjunto parcialmente alterado.
+    """
+    rejected = 0
+    errors = []
+    collected = []
+
+    for item_no, record in records:
+        contact = None if isinstance(record, Exception) else record_to_contact(record)
+        if not contact:
+            rejected += 1
+            if len(errors) < 10:
+                errors.append(f"Item {item_no}: registro ou número inválido")
+            continue
+        collected.append(contact)
+
+    if mode == 'replace' and not collected:
+        raise ValueError("Nenhum contato válido encontrado")
+    stats, diff, changed = store_contacts(collected, mode)
+
+    return {
+        'success': True,
+        'mode': mode,
+        'stats': stats,
+        'diff': diff,
+        'rejected': rejected,
+        'errors': errors,
+        'contacts': changed[:10]  # Primeiros 10 para preview
+    }
+
+# Diagnóstico sob demanda (perfil de CPU por amostragem e diff de tracemalloc)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+MAX_PROFILE_SECONDS = 120
+profiling_lock = threading.Lock()
+
+def require_admin_token(view):
+    """Exige o cabeçalho X-Admin-Token; sem ADMIN_TOKEN configurado a rota fica desativada"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': 'Endpoints de diagnóstico desativados (defina ADMIN_TOKEN)'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return jsonify({'error': 'Token de administrador inválido'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# Frames-folha (arquivo, função) que indicam espera bloqueante, não uso de CPU:
+# loop de accept do servidor, asyncio aguardando (asyncio.sleep), locks, filas, sockets
+IDLE_LEAF_FRAMES = {
+    ('selectors.py', 'select'),
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('handlers.py', 'dequeue'),
+    ('socket.py', 'accept'),
+    ('socket.py', 'readinto'),
+}
+
+def sample_cpu_profile(seconds, interval):
+    """Amostra as pilhas de todas as threads (requisições Flask e automação) por uma janela
+    
+    É um perfil de tempo de parede: amostras cujo frame-folha é uma espera
+    bloqueante conhecida são descartadas, assim como a thread do próprio
+    profiler e a do QueueListener de logs. Retorna um dict no formato interno
+    do pstats (tempos = amostras x intervalo) e as contagens de amostras
+    ativas e ociosas por thread.
+    """
+    skipped_threads = {threading.get_ident()}
+    listener_thread = getattr(log_listener, '_thread', None)
+    if listener_thread is not None:
+        skipped_threads.add(listener_thread.ident)
+    self_counts = Counter()
+    total_counts = Counter()
+    callers = defaultdict(Counter)
+    thread_counts = Counter()
+    idle_counts = Counter()
+    
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in skipped_threads:
+                continue
+            thread_name = thread_names.get(thread_id, str(thread_id))
+            leaf = frame.f_code
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAF_FRAMES:
+                idle_counts[thread_name] += 1
+                continue
+            keys = []
+            while frame is not None:
+                code = frame.f_code
+                keys.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self_counts[keys[0]] += 1
+            for key in set(keys):
+                total_counts[key] += 1
+            for callee, caller in set(zip(keys, keys[1:])):
+                callers[callee][caller] += 1
+            thread_counts[thread_name] += 1
+        time.sleep(interval)
+    
+    stats = {}
+    for key, count in total_counts.items():
+        key_callers = {caller: (n, n, n * interval, n * interval) for caller, n in callers[key].items()}
+        stats[key] = (count, count, self_counts[key] * interval, count * interval, key_callers)
+    return stats, thread_counts, idle_counts
+
+def tracemalloc_diff(seconds, group_by='lineno', top=30):
+    """Compara snapshots do tracemalloc no início e no fim da janela"""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(25)
+    try:
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+    
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), group_by)
+    
+    lines = [
+        f"tracemalloc: janela de {seconds:.1f}s, agrupado por {group_by}",
+        f"Memória rastreada: atual {current / 1024:.1f} KiB, pico {peak / 1024:.1f} KiB",
+        f"Variação total: {sum(stat.size_diff for stat in diff) / 1024:+.1f} KiB",
+        "",
+    ]
+    lines.extend(str(stat) for stat in diff[:top])
+    return '\n'.join(lines) + '\n'
+
+class _StatsSource:
+    """Adapta o dict de amostras à interface que pstats.Stats espera de um profiler"""
+    def __init__(self, stats):
+        self.stats = stats
+    
+    def create_stats(self):
+        pass
+
+def _profile_window_args():
+    seconds = float(request.args.get('seconds', 10))
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise ValueError(f"seconds deve estar entre 0 e {MAX_PROFILE_SECONDS}")
+    return seconds
+
 # Classe de automação com PROTEÇÃO ANTI-BAN GARANTIDA
 class SafeWhatsAppAutomation:
     def __init__(self, contacts, config):
@@ -246,7 +1106,7 @@ class SafeWhatsAppAutomation:
             app_state['automation_status']['currentGroup'] = current_group
         if log_message:
             app_state['automation_status']['logs'].append(f"{datetime.now().strftime('%H:%M:%S')} - {log_message}")
-            print(f"📝 {log_message}")
+            logger.info(f"📝 {log_message}")
     
     async def safe_delay(self, min_seconds=5, max_seconds=15, reason="Delay de segurança"):
         """Delay seguro com variação aleatória"""
@@ -691,7 +1551,7 @@ def run_automation_thread(contacts, config):
             app_state['automation_status']['currentStep'] = 'Automação finalizada com erros'
         
     except Exception as e:
-        print(f"❌ Erro na thread de automação: {e}")
+        logger.exception(f"❌ Erro na thread de automação: {e}")
         app_state['automation_running'] = False
         app_state['automation_status']['isRunning'] = False
         app_state['automation_status']['currentStep'] = f'Erro: {e}'
@@ -701,6 +1561,11 @@ def run_automation_thread(contacts, config):
         except:
             pass
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """Resposta JSON para uploads acima de MAX_CONTENT_LENGTH"""
+    return jsonify({'error': f'Arquivo muito grande: limite de {MAX_UPLOAD_MB} MB por requisição'}), 413
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Verifica se a API está funcionando"""
@@ -713,7 +1578,7 @@ def health_check():
 @app.route('/api/upload-csv', methods=['POST'])
 def upload_csv():
     try:
-        print("📁 Iniciando processamento de upload FLEXÍVEL...")
+        logger.info("📁 Iniciando processamento de upload FLEXÍVEL...")
         
         # Validações básicas
         if 'file' not in request.files:
@@ -723,64 +1588,140 @@ def upload_csv():
         if file.filename == '':
             return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
         
-        # Aceita CSV e TXT
-        if not (file.filename.lower().endswith('.csv') or file.filename.lower().endswith('.txt')):
-            return jsonify({'error': 'Arquivo deve ser CSV ou TXT'}), 400
+        # Aceita CSV, TXT, XLSX e Parquet
+        extension = os.path.splitext(file.filename.lower())[1]
+        if extension not in ('.csv', '.txt') + COLUMNAR_EXTENSIONS:
+            return jsonify({'error': 'Arquivo deve ser CSV, TXT, XLSX ou Parquet'}), 400
         
-        # Lê conteúdo do arquivo
-        file_content = file.read()
-        print(f"📄 Arquivo lido: {len(file_content)} bytes")
-        print(f"📋 Tipo de arquivo: {file.filename}")
+        # Modo de carga: replace (padrão), append ou merge
+        mode = request.form.get('mode', 'replace').strip().lower()
+        if mode not in UPLOAD_MODES:
+            return jsonify({'error': f"Modo inválido: use {', '.join(UPLOAD_MODES)}"}), 400
         
-        # Processa contatos de forma flexível
-        contacts = process_flexible_data(file_content)
+        # Lê direto do arquivo em spool (memória até o limite, depois disco)
+        file.stream.seek(0, os.SEEK_END)
+        logger.info(f"📄 Arquivo recebido: {file.stream.tell()} bytes")
+        logger.info(f"📋 Tipo de arquivo: {file.filename}")
+        file.stream.seek(0)
         
-        # Calcula estatísticas
-        total_contacts = len(contacts)
-        total_leads = len([c for c in contacts if c['tipo'] == 'lead'])
-        total_admins = len([c for c in contacts if c['tipo'] == 'administrador'])
-        estimated_groups = min(5, max(1, (total_leads + 49) // 50))  # Máximo 5 grupos, 50 contatos por grupo
+        # Processa contatos: planilhas colunares via pandas, texto de forma flexível
+        if extension in COLUMNAR_EXTENSIONS:
+            try:
+                contacts = process_columnar_file(file.stream, extension)
+            except ImportError as e:
+                return jsonify({'error': f'Dependência ausente para {extension}: {e}'}), 400
+        else:
+            contacts = process_flexible_data(file.stream)
         
-        # Armazena contatos no estado global
-        app_state['contacts'] = contacts
+        # Armazena contatos e índices no estado global
+        stats, diff, changed = store_contacts(contacts, mode)
+        total_contacts = stats['totalContacts']
         
-        print(f"📊 ARQUIVO PROCESSADO COM SUCESSO: {total_contacts} contatos válidos")
-        print(f"  - {total_leads} leads")
-        print(f"  - {total_admins} administradores")
-        print(f"  - {estimated_groups} grupos estimados (LIMITE SEGURO)")
+        logger.info(f"📊 ARQUIVO PROCESSADO COM SUCESSO: {len(contacts)} contatos válidos (modo {mode})")
+        logger.info(f"  - {diff['added']} adicionados, {diff['updated']} atualizados, {diff['unchanged']} inalterados")
+        logger.info(f"  - {stats['totalLeads']} leads")
+        logger.info(f"  - {stats['totalAdmins']} administradores")
+        logger.info(f"  - {stats['estimatedGroups']} grupos estimados (LIMITE SEGURO)")
         
         # Retorna resultado
         return jsonify({
             'success': True,
             'message': f'Arquivo processado com PROTEÇÃO ANTI-BAN! {total_contacts} contatos válidos encontrados.',
             'filename': file.filename,
+            'mode': mode,
             'stats': {
-                'totalContacts': total_contacts,
-                'totalLeads': total_leads,
-                'totalAdmins': total_admins,
-                'estimatedGroups': estimated_groups,
+                **stats,
                 'validationMessage': f'{total_contacts} contatos válidos processados com PROTEÇÃO ANTI-BAN (máx 5 grupos, 50 contatos/grupo)'
             },
-            'contacts': contacts[:10]  # Primeiros 10 para preview
+            'diff': diff,
+            'contacts': changed[:10]  # Primeiros 10 para preview
         })
         
+    except HTTPException:
+        raise  # Ex.: 413 quando o upload excede MAX_CONTENT_LENGTH
     except Exception as e:
-        print(f"❌ Erro geral no upload: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Erro geral no upload: {e}")
         return jsonify({'error': f'Erro ao processar arquivo: {str(e)}'}), 500
 
+@app.route('/api/contacts', methods=['GET'])
+def list_contacts():
+    """Lista contatos carregados com paginação por cursor e filtros indexados"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'Parâmetro limit inválido'}), 400
+
+    tipo = request.args.get('tipo', '').strip().lower() or None
+    ddd = ''.join(filter(str.isdigit, request.args.get('ddd', ''))) or None
+    numero = ''.join(filter(str.isdigit, request.args.get('numero', ''))) or None
+    nome = request.args.get('nome', '').strip() or None
+    cursor = request.args.get('cursor', '')
+
+    with contacts_lock:
+        index = app_state['contact_index']
+        if index is None:
+            return jsonify({'items': [], 'nextCursor': None, 'total': 0, 'totalContacts': 0})
+
+        # Cursor no formato "<geração>.<offset>"
+        offset = 0
+        if cursor:
+            try:
+                generation, offset = (int(part) for part in cursor.split('.', 1))
+            except ValueError:
+                return jsonify({'error': 'Cursor inválido'}), 400
+            if generation != index.generation or offset < 0:
+                return jsonify({'error': 'Cursor expirado: a lista de contatos foi alterada'}), 409
+
+        result = index.query(tipo=tipo, ddd=ddd, numero=numero, nome=nome, offset=offset, limit=limit)
+        next_cursor = f"{index.generation}.{result['next_offset']}" if result['next_offset'] is not None else None
+
+        return jsonify({
+            'items': result['items'],
+            'nextCursor': next_cursor,
+            'total': result['total'],
+            'totalContacts': len(index.contacts)
+        })
+
+@app.route('/api/contacts/import/ndjson', methods=['POST'])
+def import_contacts_ndjson():
+    """Importa contatos em JSON Lines lendo o corpo da requisição em streaming"""
+    return _import_contacts_stream(iter_ndjson_records)
+
+@app.route('/api/contacts/import/json', methods=['POST'])
+def import_contacts_json():
+    """Importa um array JSON de contatos, decodificado incrementalmente"""
+    return _import_contacts_stream(iter_json_array_records)
+
+def _import_contacts_stream(parser):
+    mode = request.args.get('mode', 'replace').strip().lower()
+    if mode not in UPLOAD_MODES:
+        return jsonify({'error': f"Modo inválido: use {', '.join(UPLOAD_MODES)}"}), 400
+    try:
+        result = import_contact_records(parser(request.stream), mode)
+        total_contacts = result['stats']['totalContacts']
+        logger.info(f"📊 IMPORTAÇÃO JSON CONCLUÍDA (modo {mode}): {result['diff']['added']} adicionados, "
+                    f"{result['diff']['updated']} atualizados, {result['rejected']} rejeitados")
+        result['message'] = f'Importação concluída! {total_contacts} contatos válidos carregados.'
+        return jsonify(result)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        return jsonify({'error': f'Erro ao importar contatos: {str(e)}'}), 400
+    except Exception as e:
+        logger.exception(f"❌ Erro geral na importação JSON: {e}")
+        return jsonify({'error': f'Erro ao importar contatos: {str(e)}'}), 500
+
 @app.route('/api/automation/start', methods=['POST'])
 def start_automation():
     try:
-        print("🛡️ INICIANDO automação com PROTEÇÃO ANTI-BAN GARANTIDA...")
+        logger.info("🛡️ INICIANDO automação com PROTEÇÃO ANTI-BAN GARANTIDA...")
         
         # Recebe configuração
         data = request.get_json()
         config = data.get('config', {})
         
-        print(f"Configuração recebida: {config}")
-        print(f"Contatos disponíveis: {len(app_state['contacts'])}")
+        logger.info(f"Configuração recebida: {config}")
+        logger.info(f"Contatos disponíveis: {len(app_state['contacts'])}")
         
         # Valida se há contatos
         if not app_state['contacts']:
@@ -823,6 +1764,7 @@ def start_automation():
         automation_thread = threading.Thread(
             target=run_automation_thread,
             args=(app_state['contacts'], python_config),
+            name='automation',
             daemon=True
         )
         automation_thread.start()
@@ -833,9 +1775,7 @@ def start_automation():
         })
             
     except Exception as e:
-        print(f"❌ ERRO na automação: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ ERRO na automação: {e}")
         
         app_state['automation_running'] = False
         app_state['automation_status']['isRunning'] = False
@@ -930,6 +1870,76 @@ Contatos processados:
     except Exception as e:
         return jsonify({'error': f'Erro ao gerar relatório: {str(e)}'}), 500
 
+@app.route('/api/admin/profile/cpu', methods=['POST'])
+@require_admin_token
+def profile_cpu():
+    """Perfil de CPU por amostragem de todas as threads; retorna pstats ou resumo em texto"""
+    try:
+        seconds = _profile_window_args()
+        interval = int(request.args.get('interval_ms', 10)) / 1000
+        if not 0.001 <= interval <= 1:
+            raise ValueError("interval_ms deve estar entre 1 e 1000")
+        top = int(request.args.get('top', 40))
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetro inválido: {e}'}), 400
+    output_format = request.args.get('format', 'text')
+    if output_format not in ('text', 'pstats'):
+        return jsonify({'error': 'format deve ser text ou pstats'}), 400
+    
+    if not profiling_lock.acquire(blocking=False):
+        return jsonify({'error': 'Já existe um perfil em andamento'}), 409
+    try:
+        logger.info(f"🔬 Perfil de CPU por {seconds:.1f}s (intervalo {interval * 1000:.0f}ms)")
+        stats, thread_counts, idle_counts = sample_cpu_profile(seconds, interval)
+    finally:
+        profiling_lock.release()
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if output_format == 'pstats':
+        return send_file(io.BytesIO(marshal.dumps(stats)), as_attachment=True,
+                         download_name=f'cpu_profile_{timestamp}.pstats',
+                         mimetype='application/octet-stream')
+    
+    # Resumo em texto via pstats (tempos são estimativas por amostragem)
+    summary = io.StringIO()
+    summary.write(f"Perfil por amostragem: {seconds:.1f}s, intervalo {interval * 1000:.0f}ms\n")
+    summary.write("Tempos = tempo de parede das amostras ativas; esperas bloqueantes conhecidas\n"
+                  "(select, locks, filas, sockets) foram descartadas.\n")
+    summary.write("Amostras por thread (ativas / ociosas descartadas):\n")
+    for name in sorted(set(thread_counts) | set(idle_counts), key=lambda n: -thread_counts[n]):
+        summary.write(f"  {name}: {thread_counts[name]} / {idle_counts[name]}\n")
+    summary.write("\n")
+    if stats:
+        profile = pstats.Stats(_StatsSource(stats), stream=summary)
+        profile.sort_stats('cumulative').print_stats(top)
+    return send_file(io.BytesIO(summary.getvalue().encode('utf-8')), as_attachment=True,
+                     download_name=f'cpu_profile_{timestamp}.txt', mimetype='text/plain')
+
+@app.route('/api/admin/profile/memory', methods=['POST'])
+@require_admin_token
+def profile_memory():
+    """Diff de snapshots do tracemalloc durante a janela (todas as threads)"""
+    try:
+        seconds = _profile_window_args()
+        top = int(request.args.get('top', 30))
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetro inválido: {e}'}), 400
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': 'group_by deve ser lineno, filename ou traceback'}), 400
+    
+    if not profiling_lock.acquire(blocking=False):
+        return jsonify({'error': 'Já existe um perfil em andamento'}), 409
+    try:
+        logger.info(f"🔬 Diff de memória (tracemalloc) por {seconds:.1f}s")
+        report = tracemalloc_diff(seconds, group_by, top)
+    finally:
+        profiling_lock.release()
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return send_file(io.BytesIO(report.encode('utf-8')), as_attachment=True,
+                     download_name=f'memory_diff_{timestamp}.txt', mimetype='text/plain')
+
 @app.route('/api/python/generate', methods=['POST'])
 def generate_python_code():
     """Gera código Python para download (opcional)"""
@@ -995,15 +2005,15 @@ print("\\n🛡️ GARANTIA: Esta automação foi projetada para EVITAR BANIMENTO
         return jsonify({'error': f'Erro ao gerar código: {str(e)}'}), 500
 
 if __name__ == '__main__':
-    print("🛡️ Iniciando WhatsApp Automation API - PROTEÇÃO ANTI-BAN GARANTIDA")
-    print("📡 Servidor rodando em: http://localhost:5000")
-    print("🔗 Frontend deve conectar em: http://localhost:5173")
-    print("⚡ Execução SEGURA no backend")
-    print("🛡️ PROTEÇÃO ANTI-BAN: Máximo 5 grupos por execução")
-    print("👥 LIMITE SEGURO: Máximo 50 contatos por grupo")
-    print("⏳ DELAYS SEGUROS: 8-18s entre contatos, 2-5min entre grupos")
-    print("⏸️ PAUSA AUTOMÁTICA: 30 min a cada 3 grupos")
-    print("🎯 GARANTIA: Configurações para EVITAR banimentos")
-    print("="*60)
+    logger.info("🛡️ Iniciando WhatsApp Automation API - PROTEÇÃO ANTI-BAN GARANTIDA")
+    logger.info("📡 Servidor rodando em: http://localhost:5000")
+    logger.info("🔗 Frontend deve conectar em: http://localhost:5173")
+    logger.info("⚡ Execução SEGURA no backend")
+    logger.info("🛡️ PROTEÇÃO ANTI-BAN: Máximo 5 grupos por execução")
+    logger.info("👥 LIMITE SEGURO: Máximo 50 contatos por grupo")
+    logger.info("⏳ DELAYS SEGUROS: 8-18s entre contatos, 2-5min entre grupos")
+    logger.info("⏸️ PAUSA AUTOMÁTICA: 30 min a cada 3 grupos")
+    logger.info("🎯 GARANTIA: Configurações para EVITAR banimentos")
+    logger.info("=" * 60)
     
     app.run(port=5000)
\ No newline at end of file
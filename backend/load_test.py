@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Teste de carga offline da API REST
+Sobe o app Flask localmente com a automação substituída por um stub que só
+emite eventos via update_status, e mede req/s e latências por endpoint.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+import argparse
+import threading
+import http.client
+from collections import Counter, defaultdict
+
+# Menos ruído no console durante a carga (pode ser sobrescrito pelo ambiente)
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import app as backend
+from werkzeug.serving import make_server
+
+# Sem log de acesso por requisição do servidor de desenvolvimento
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+
+def stub_automation_thread(contacts, config, event_interval, max_logs):
+    """Substitui run_automation_thread: emite eventos de status sem abrir navegador
+
+    Os logs do status são limitados às últimas max_logs linhas, para que a
+    latência de /api/automation/status não cresça só pela taxa de eventos do stub.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    automation = backend.SafeWhatsAppAutomation(contacts, config)
+
+    async def emit_events():
+        event = 0
+        while backend.app_state['automation_running']:
+            event += 1
+            group = event // 50 + 1
+            await automation.update_status(
+                f"Stub: evento {event}",
+                progress=event % 100,
+                current_group=f"Grupo Stub {group}",
+                log_message=f"🧪 Evento de carga {event}"
+            )
+            status = backend.app_state['automation_status']
+            status['processedContacts'] = event
+            del status['logs'][:-max_logs]
+            await asyncio.sleep(event_interval)
+
+    try:
+        loop.run_until_complete(emit_events())
+    finally:
+        backend.app_state['automation_status']['isRunning'] = False
+        loop.close()
+
+
+def random_number():
+    """Número de celular brasileiro válido (DDD + 9 dígitos)"""
+    return f"{random.choice((11, 21, 62))}9{random.randint(0, 99999999):08d}"
+
+
+def build_csv(numbers):
+    """Gera CSV de contatos válidos para os números informados"""
+    lines = ['nome,numero,tipo']
+    for numero in numbers:
+        tipo = 'administrador' if random.random() < 0.05 else 'lead'
+        lines.append(f"Contato Carga {random.randint(0, 999999)},{numero},{tipo}")
+    return '\n'.join(lines).encode('utf-8')
+
+
+def delta_numbers(rows, known_numbers, overlap):
+    """Lote novo por upload: uma fração dos números já carregados (atualizações) e o resto inédito"""
+    return [random.choice(known_numbers) if known_numbers and random.random() < overlap else random_number()
+            for _ in range(rows)]
+
+
+def encode_multipart(filename, content, fields=None):
+    """Monta corpo multipart/form-data para o upload"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: text/csv\r\n\r\n'.encode() + content + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class LoadStats:
+    """Latências e erros por endpoint (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.upload_diff = Counter()
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(sorted_values, pct):
+        index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+        return sorted_values[index]
+
+    def report(self, elapsed):
+        rows = []
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(values),
+                'errors': self.errors[endpoint],
+                'rps': len(values) / elapsed,
+                'p50_ms': self.percentile(values, 50) * 1000,
+                'p90_ms': self.percentile(values, 90) * 1000,
+                'p99_ms': self.percentile(values, 99) * 1000,
+                'max_ms': values[-1] * 1000,
+            })
+        return rows
+
+
+def timed_request(host, port, stats, endpoint, method, path, body=None, headers=None):
+    """Executa uma requisição, registra a latência sob o rótulo do endpoint e retorna o corpo"""
+    start = time.perf_counter()
+    ok = False
+    data = None
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        ok = response.status < 400
+        conn.close()
+    except (OSError, http.client.HTTPException):
+        pass
+    stats.record(endpoint, time.perf_counter() - start, ok)
+    return data if ok else None
+
+
+def poller(host, port, stats, deadline, interval):
+    """Cliente de dashboard: consulta /api/automation/status em loop"""
+    while time.monotonic() < deadline:
+        timed_request(host, port, stats, 'GET /api/automation/status', 'GET', '/api/automation/status')
+        if interval:
+            time.sleep(interval)
+
+
+def browser(host, port, stats, deadline):
+    """Cliente navegando na lista de contatos paginada"""
+    while time.monotonic() < deadline:
+        ddd = random.choice(('11', '21', '62'))
+        timed_request(host, port, stats, 'GET /api/contacts', 'GET', f'/api/contacts?ddd={ddd}&limit=50')
+
+
+def uploader(host, port, stats, deadline, rows, known_numbers, overlap, mode):
+    """Cliente enviando um CSV novo a cada requisição via /api/upload-csv"""
+    while time.monotonic() < deadline:
+        payload = build_csv(delta_numbers(rows, known_numbers, overlap))
+        body, content_type = encode_multipart('carga.csv', payload, {'mode': mode})
+        data = timed_request(host, port, stats, f'POST /api/upload-csv ({mode})', 'POST', '/api/upload-csv',
+                             body=body, headers={'Content-Type': content_type})
+        if data:
+            with stats.lock:
+                stats.upload_diff.update(json.loads(data).get('diff', {}))
+
+
+def run_load_test(args):
+    server = make_server('127.0.0.1', args.port, backend.app, threaded=True)
+    host, port = server.server_address[:2]
+    threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+
+    # Troca a automação real (Playwright) pelo stub de eventos
+    event_interval = args.event_interval_ms / 1000
+    backend.run_automation_thread = lambda contacts, config: stub_automation_thread(
+        contacts, config, event_interval, args.max_logs)
+
+    print(f"🧪 Servidor de carga em http://{host}:{port}", file=sys.stderr)
+    known_numbers = [random_number() for _ in range(args.initial_contacts)]
+    body, content_type = encode_multipart('inicial.csv', build_csv(known_numbers))
+    setup_stats = LoadStats()
+    timed_request(host, port, setup_stats, 'setup', 'POST', '/api/upload-csv',
+                  body=body, headers={'Content-Type': content_type})
+    timed_request(host, port, setup_stats, 'setup', 'POST', '/api/automation/start',
+                  body=json.dumps({'config': {'baseName': 'Grupo Carga'}}), headers={'Content-Type': 'application/json'})
+    if setup_stats.errors['setup']:
+        print("❌ Falha ao preparar o servidor (upload inicial ou início da automação)", file=sys.stderr)
+        return None
+
+    stats = LoadStats()
+    deadline = time.monotonic() + args.duration
+    workers = (
+        [threading.Thread(target=poller, args=(host, port, stats, deadline, args.poll_interval_ms / 1000))
+         for _ in range(args.pollers)]
+        + [threading.Thread(target=browser, args=(host, port, stats, deadline)) for _ in range(args.browsers)]
+        + [threading.Thread(target=uploader, args=(host, port, stats, deadline, args.upload_rows,
+                                                   known_numbers, args.upload_overlap, args.upload_mode))
+           for _ in range(args.uploaders)]
+    )
+    print(f"⏱️  {args.duration}s: {args.pollers} pollers, {args.browsers} browsers, {args.uploaders} uploaders "
+          f"({args.upload_rows} linhas, {args.upload_overlap:.0%} já carregadas, modo {args.upload_mode}); "
+          f"stub: 1 evento a cada {args.event_interval_ms:g}ms, logs limitados a {args.max_logs}", file=sys.stderr)
+
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.monotonic() - started
+
+    timed_request(host, port, setup_stats, 'teardown', 'POST', '/api/automation/stop')
+    server.shutdown()
+
+    rows = stats.report(elapsed)
+    events = backend.app_state['automation_status']['processedContacts']
+    rows.append({'endpoint': '(eventos de status emitidos)', 'requests': events, 'errors': 0,
+                 'rps': events / elapsed, 'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None})
+    # Contatos adicionados/atualizados/inalterados somados em todos os uploads
+    for key in ('added', 'updated', 'unchanged'):
+        rows.append({'endpoint': f'(upload: contatos {key})', 'requests': stats.upload_diff[key], 'errors': 0,
+                     'rps': stats.upload_diff[key] / elapsed,
+                     'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None})
+    return rows
+
+
+def print_report(rows):
+    header = f"{'Endpoint':<36} {'Req':>7} {'Erros':>6} {'Req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'máx ms':>9}"
+    print("=" * len(header))
+    print(header)
+    print("-" * len(header))
+    fmt = lambda value: f"{value:9.1f}" if value is not None else f"{'-':>9}"
+    for row in rows:
+        print(f"{row['endpoint']:<36} {row['requests']:>7} {row['errors']:>6} {row['rps']:9.1f} "
+              f"{fmt(row['p50_ms'])} {fmt(row['p90_ms'])} {fmt(row['p99_ms'])} {fmt(row['max_ms'])}")
+    print("=" * len(header))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga offline da API WhatsApp Automation")
+    parser.add_argument('--duration', type=float, default=15, help="Duração da carga em segundos")
+    parser.add_argument('--port', type=int, default=0, help="Porta do servidor local (0 = livre)")
+    parser.add_argument('--pollers', type=int, default=20, help="Clientes consultando /api/automation/status")
+    parser.add_argument('--poll-interval-ms', type=float, default=0, help="Intervalo entre consultas (0 = sem pausa)")
+    parser.add_argument('--browsers', type=int, default=2, help="Clientes consultando /api/contacts")
+    parser.add_argument('--uploaders', type=int, default=2, help="Clientes enviando CSV em paralelo")
+    parser.add_argument('--upload-rows', type=int, default=1000, help="Linhas por CSV enviado")
+    parser.add_argument('--upload-mode', choices=backend.UPLOAD_MODES, default='merge', help="Modo do upload")
+    parser.add_argument('--upload-overlap', type=float, default=0.3,
+                        help="Fração de cada upload com números já carregados (0 a 1)")
+    parser.add_argument('--initial-contacts', type=int, default=5000, help="Contatos carregados antes da carga")
+    parser.add_argument('--event-interval-ms', type=float, default=10, help="Intervalo entre eventos do stub")
+    parser.add_argument('--max-logs', type=int, default=100, help="Linhas de log mantidas no status durante a carga")
+    parser.add_argument('--json', action='store_true', help="Imprime o relatório em JSON")
+    args = parser.parse_args()
+
+    rows = run_load_test(args)
+    if rows is None:
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        print_report(rows)
+
+
+if __name__ == "__main__":
+    main()